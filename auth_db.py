@@ -1,409 +1,666 @@
-from __future__ import annotations
-from pathlib import Path
-import sqlite3
-from datetime import datetime, timezone
-from typing import Optional, Dict, List
-import secrets
-import os
-
-from config import get_settings
-
-settings = get_settings()
-DB_PATH = settings.api_keys_db_path
-DB_URL = settings.api_keys_db_url
-
-# Lazy import psycopg2 if needed
-_psycopg2 = None
-
-
-def _utc_now() -> str:
-    # Use timezone-aware UTC ISO format to avoid deprecation warnings
-    return datetime.now(timezone.utc).isoformat()
-
-
-# ---------- SQLite helpers (existing behavior) ----------
-
-def _sqlite_connect(read_only: bool = False):
-    DB_PATH.parent.mkdir(parents=True, exist_ok=True)
-    if read_only:
-        uri = f"file:{DB_PATH}?mode=ro"
-        return sqlite3.connect(uri, uri=True)
-    return sqlite3.connect(str(DB_PATH))
-
-
-def _sqlite_column_exists(conn: sqlite3.Connection, table: str, col: str) -> bool:
-    cur = conn.cursor()
-    cur.execute(f"PRAGMA table_info({table});")
-    cols = [r[1] for r in cur.fetchall()]
-    return col in cols
-
-
-def _sqlite_ensure_initialized(seed: bool = False) -> None:
-    conn = _sqlite_connect(read_only=False)
-    try:
-        cur = conn.cursor()
-        cur.execute(
-            """
-            CREATE TABLE IF NOT EXISTS api_keys (
-                api_key TEXT PRIMARY KEY,
-                client_name TEXT NOT NULL,
-                created_at TEXT NOT NULL,
-                rate_limit INTEGER DEFAULT 60
-            );
-            """
-        )
-        conn.commit()
-
-        # Safe migrations: add lifecycle columns if missing
-        if not _sqlite_column_exists(conn, "api_keys", "is_active"):
-            cur.execute("ALTER TABLE api_keys ADD COLUMN is_active INTEGER DEFAULT 1;")
-        if not _sqlite_column_exists(conn, "api_keys", "revoked_at"):
-            cur.execute("ALTER TABLE api_keys ADD COLUMN revoked_at TEXT;")
-        if not _sqlite_column_exists(conn, "api_keys", "last_used_at"):
-            cur.execute("ALTER TABLE api_keys ADD COLUMN last_used_at TEXT;")
-        conn.commit()
-
-        # Optional seed: only if requested and table empty
-        if seed:
-            cur.execute("SELECT COUNT(*) FROM api_keys;")
-            count = int(cur.fetchone()[0])
-            if count == 0:
-                sample_key = "testkey123"
-                now = _utc_now()
-                cur.execute(
-                    """
-                    INSERT OR IGNORE INTO api_keys(api_key, client_name, created_at, rate_limit, is_active)
-                    VALUES (?, ?, ?, ?, 1);
-                    """,
-                    (sample_key, "local-dev", now, 60),
-                )
-                conn.commit()
-    finally:
-        conn.close()
-
-
-# ---------- Postgres helpers ----------
-
-def _ensure_psycopg2():
-    global _psycopg2
-    if _psycopg2 is None:
-        try:
-            import psycopg2
-            import psycopg2.extras as extras
-        except Exception as e:
-            raise RuntimeError("psycopg2 is required for Postgres support: install psycopg[binary]") from e
-        _psycopg2 = psycopg2
-        _psycopg2_extras = extras
-    return _psycopg2
-
-
-def _pg_connect():
-    ensure = _ensure_psycopg2()
-    # psycopg2.connect will parse DATABASE_URL
-    conn = _psycopg2.connect(DB_URL)
-    return conn
-
-
-def _pg_ensure_initialized(seed: bool = False) -> None:
-    conn = _pg_connect()
-    try:
-        cur = conn.cursor()
-        # Create table if not exists with necessary columns
-        cur.execute(
-            """
-            CREATE TABLE IF NOT EXISTS api_keys (
-                api_key TEXT PRIMARY KEY,
-                client_name TEXT NOT NULL,
-                created_at TEXT NOT NULL,
-                rate_limit INTEGER DEFAULT 60,
-                is_active INTEGER DEFAULT 1,
-                revoked_at TEXT,
-                last_used_at TEXT
-            );
-            """
-        )
-        conn.commit()
-        if seed:
-            cur.execute("SELECT COUNT(*) FROM api_keys;")
-            count = int(cur.fetchone()[0])
-            if count == 0:
-                sample_key = "testkey123"
-                now = _utc_now()
-                cur.execute(
-                    "INSERT INTO api_keys(api_key, client_name, created_at, rate_limit, is_active) VALUES (%s, %s, %s, %s, 1) ON CONFLICT DO NOTHING;",
-                    (sample_key, "local-dev", now, 60),
-                )
-                conn.commit()
-    finally:
-        conn.close()
-
-
-# ---------- Public API (choose backend based on DB_URL) ----------
-
-def ensure_db_initialized(seed: bool = False) -> None:
-    if DB_URL:
-        _pg_ensure_initialized(seed=seed)
-    else:
-        _sqlite_ensure_initialized(seed=seed)
-
-
-def get_key_info(api_key: str) -> Optional[Dict]:
-    """Return active key record dict, or None if missing/inactive/revoked."""
-    if DB_URL:
-        # Postgres
-        conn = _pg_connect()
-        try:
-            cur = conn.cursor()
-            cur.execute(
-                """
-                SELECT api_key, client_name, created_at, rate_limit, is_active, revoked_at, last_used_at
-                FROM api_keys
-                WHERE api_key = %s
-                LIMIT 1;
-                """,
-                (api_key,),
-            )
-            row = cur.fetchone()
-            if not row:
-                return None
-            cols = [d[0] for d in cur.description]
-            d = dict(zip(cols, row))
-            if int(d.get("is_active") or 0) != 1:
-                return None
-            if d.get("revoked_at"):
-                return None
-            return d
-        finally:
-            conn.close()
-    else:
-        if not DB_PATH.exists():
-            return None
-        conn = _sqlite_connect(read_only=True)
-        conn.row_factory = sqlite3.Row
-        try:
-            cur = conn.cursor()
-            cur.execute(
-                """
-                SELECT api_key, client_name, created_at, rate_limit, is_active, revoked_at, last_used_at
-                FROM api_keys
-                WHERE api_key = ?
-                LIMIT 1;
-                """,
-                (api_key,),
-            )
-            row = cur.fetchone()
-            if not row:
-                return None
-            d = {k: row[k] for k in row.keys()}
-            if int(d.get("is_active") or 0) != 1:
-                return None
-            if d.get("revoked_at"):
-                return None
-            return d
-        finally:
-            conn.close()
-
-
-def update_last_used(api_key: str) -> None:
-    if DB_URL:
-        conn = _pg_connect()
-        try:
-            cur = conn.cursor()
-            cur.execute("UPDATE api_keys SET last_used_at = %s WHERE api_key = %s;", (_utc_now(), api_key))
-            conn.commit()
-        finally:
-            conn.close()
-    else:
-        if not DB_PATH.exists():
-            return
-        conn = _sqlite_connect(read_only=False)
-        try:
-            cur = conn.cursor()
-            cur.execute("UPDATE api_keys SET last_used_at = ? WHERE api_key = ?;", (_utc_now(), api_key))
-            conn.commit()
-        finally:
-            conn.close()
-
-
-def create_key(client_name: str, rate_limit: int = 60) -> Dict:
-    api_key = secrets.token_urlsafe(32)
-    now = _utc_now()
-    if DB_URL:
-        conn = _pg_connect()
-        try:
-            cur = conn.cursor()
-            cur.execute(
-                "INSERT INTO api_keys(api_key, client_name, created_at, rate_limit, is_active, revoked_at, last_used_at) VALUES (%s, %s, %s, %s, 1, NULL, NULL);",
-                (api_key, client_name, now, int(rate_limit)),
-            )
-            conn.commit()
-            return {
-                "api_key": api_key,
-                "client_name": client_name,
-                "created_at": now,
-                "rate_limit": int(rate_limit),
-                "is_active": 1,
-                "revoked_at": None,
-                "last_used_at": None,
-            }
-        finally:
-            conn.close()
-    else:
-        conn = _sqlite_connect(read_only=False)
-        try:
-            cur = conn.cursor()
-            cur.execute(
-                """
-                INSERT INTO api_keys(api_key, client_name, created_at, rate_limit, is_active, revoked_at, last_used_at)
-                VALUES (?, ?, ?, ?, 1, NULL, NULL);
-                """,
-                (api_key, client_name, now, int(rate_limit)),
-            )
-            conn.commit()
-            return {
-                "api_key": api_key,
-                "client_name": client_name,
-                "created_at": now,
-                "rate_limit": int(rate_limit),
-                "is_active": 1,
-                "revoked_at": None,
-                "last_used_at": None,
-            }
-        finally:
-            conn.close()
-
-
-def revoke_key(api_key: str) -> bool:
-    if DB_URL:
-        conn = _pg_connect()
-        try:
-            cur = conn.cursor()
-            cur.execute(
-                "UPDATE api_keys SET revoked_at = %s, is_active = 0 WHERE api_key = %s;",
-                (_utc_now(), api_key),
-            )
-            conn.commit()
-            return cur.rowcount > 0
-        finally:
-            conn.close()
-    else:
-        conn = _sqlite_connect(read_only=False)
-        try:
-            cur = conn.cursor()
-            cur.execute(
-                "UPDATE api_keys SET revoked_at = ?, is_active = 0 WHERE api_key = ?;",
-                (_utc_now(), api_key),
-            )
-            conn.commit()
-            return cur.rowcount > 0
-        finally:
-            conn.close()
-
-
-def set_key_active(api_key: str, active: bool) -> bool:
-    if DB_URL:
-        conn = _pg_connect()
-        try:
-            cur = conn.cursor()
-            cur.execute("UPDATE api_keys SET is_active = %s WHERE api_key = %s;", (1 if active else 0, api_key))
-            conn.commit()
-            return cur.rowcount > 0
-        finally:
-            conn.close()
-    else:
-        conn = _sqlite_connect(read_only=False)
-        try:
-            cur = conn.cursor()
-            cur.execute("UPDATE api_keys SET is_active = ? WHERE api_key = ?;", (1 if active else 0, api_key))
-            conn.commit()
-            return cur.rowcount > 0
-        finally:
-            conn.close()
-
-
-def rotate_key(old_api_key: str) -> Optional[Dict]:
-    # find old key info even if active; rotation revokes old
-    if DB_URL:
-        conn = _pg_connect()
-        try:
-            cur = conn.cursor()
-            cur.execute("SELECT client_name, rate_limit FROM api_keys WHERE api_key = %s LIMIT 1;", (old_api_key,))
-            row = cur.fetchone()
-            if not row:
-                return None
-            client_name, rate_limit = row[0], int(row[1] or 60)
-        finally:
-            conn.close()
-
-        revoke_key(old_api_key)
-        return create_key(client_name=client_name, rate_limit=rate_limit)
-    else:
-        conn = _sqlite_connect(read_only=False)
-        conn.row_factory = sqlite3.Row
-        try:
-            cur = conn.cursor()
-            cur.execute(
-                "SELECT client_name, rate_limit FROM api_keys WHERE api_key = ? LIMIT 1;",
-                (old_api_key,),
-            )
-            row = cur.fetchone()
-            if not row:
-                return None
-            client_name = row["client_name"]
-            rate_limit = int(row["rate_limit"] or 60)
-        finally:
-            conn.close()
-
-        revoke_key(old_api_key)
-        return create_key(client_name=client_name, rate_limit=rate_limit)
-
-
-def list_keys(mask: bool = True) -> List[Dict]:
-    if DB_URL:
-        conn = _pg_connect()
-        try:
-            cur = conn.cursor()
-            cur.execute(
-                """
-                SELECT api_key, client_name, created_at, rate_limit, is_active, revoked_at, last_used_at
-                FROM api_keys
-                ORDER BY created_at DESC;
-                """
-            )
-            rows = cur.fetchall()
-            cols = [d[0] for d in cur.description]
-            out = []
-            for r in rows:
-                d = dict(zip(cols, r))
-                if mask:
-                    k = d["api_key"]
-                    d["api_key"] = ("*" * max(0, len(k) - 4)) + k[-4:]
-                out.append(d)
-            return out
-        finally:
-            conn.close()
-    else:
-        if not DB_PATH.exists():
-            return []
-        conn = _sqlite_connect(read_only=True)
-        conn.row_factory = sqlite3.Row
-        try:
-            cur = conn.cursor()
-            cur.execute(
-                """
-                SELECT api_key, client_name, created_at, rate_limit, is_active, revoked_at, last_used_at
-                FROM api_keys
-                ORDER BY created_at DESC;
-                """
-            )
-            rows = cur.fetchall()
-            out = []
-            for r in rows:
-                d = {k: r[k] for k in r.keys()}
-                if mask:
-                    k = d["api_key"]
-                    d["api_key"] = ("*" * max(0, len(k) - 4)) + k[-4:]
-                out.append(d)
-            return out
-        finally:
-            conn.close()
+from __future__ import annotations
+import atexit
+from collections import OrderedDict
+from contextlib import contextmanager
+import hashlib
+from pathlib import Path
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Final, Iterator, Optional, Dict, List
+import secrets
+import os
+
+from config import get_settings
+
+try:
+    import apsw  # type: ignore
+except Exception:  # pragma: no cover
+    apsw = None
+
+settings = get_settings()
+DB_PATH = settings.api_keys_db_path
+DB_URL = settings.api_keys_db_url
+
+# Lazy import psycopg (v3) if needed
+_psycopg = None
+
+
+def _utc_now() -> str:
+    # Use timezone-aware UTC ISO format to avoid deprecation warnings
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _key_hash(api_key: str) -> bytes:
+    """16-byte BLAKE2s digest used for indexed lookups.
+
+    A fixed-size BLOB keeps B-tree pages shallow and comparisons cheap
+    compared to matching the 43-char base64 key text byte-by-byte.
+    """
+    return hashlib.blake2s(api_key.encode("utf-8"), digest_size=16).digest()
+
+
+# SQL written once in qmark style; each backend materializes its own dict at
+# init (Postgres translates ? to %s), so every execute passes the same
+# interned string object and driver-side statement caches stay hot.
+_SQL: Final[Dict[str, str]] = {
+    "select_key": (
+        "SELECT api_key, client_name, created_at, rate_limit, is_active, revoked_at, last_used_at "
+        "FROM api_keys WHERE api_key = ? LIMIT 1;"
+    ),
+    "select_key_by_hash": (
+        "SELECT api_key, client_name, created_at, rate_limit, is_active, revoked_at, last_used_at "
+        "FROM api_keys WHERE api_key_hash = ? LIMIT 1;"
+    ),
+    "update_last_used": "UPDATE api_keys SET last_used_at = ? WHERE api_key = ?;",
+    "insert_key": (
+        "INSERT INTO api_keys(api_key, api_key_hash, client_name, created_at, rate_limit, is_active, revoked_at, last_used_at) "
+        "VALUES (?, ?, ?, ?, ?, 1, NULL, NULL);"
+    ),
+    "revoke_key": "UPDATE api_keys SET revoked_at = ?, is_active = 0 WHERE api_key = ?;",
+    "set_active": "UPDATE api_keys SET is_active = ? WHERE api_key = ?;",
+    "select_for_rotate": "SELECT client_name, rate_limit FROM api_keys WHERE api_key = ? LIMIT 1;",
+    "list_keys": (
+        "SELECT api_key, client_name, created_at, rate_limit, is_active, revoked_at, last_used_at "
+        "FROM api_keys ORDER BY created_at DESC;"
+    ),
+}
+
+# column order of the select_key* statements, used to build dicts from the
+# plain tuples apsw returns
+_KEY_COLUMNS: Final = (
+    "api_key", "client_name", "created_at", "rate_limit", "is_active", "revoked_at", "last_used_at",
+)
+
+_LIST_KEYS_BATCH = 500
+
+# Slicing a precomputed constant avoids allocating a fresh run of "*"s for
+# every masked key in a listing.
+_MASK = "*" * 64
+
+
+def _mask_api_key(k: str) -> str:
+    # keys of four chars or fewer are fully starred: a zero-length star
+    # prefix plus the whole suffix would echo them verbatim
+    n = len(k)
+    return _MASK[: n - 4] + k[-4:] if n > 4 else _MASK[:n]
+
+
+# ---------- SQLite plumbing ----------
+
+def _sqlite_open() -> sqlite3.Connection:
+    DB_PATH.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(str(DB_PATH), check_same_thread=False, cached_statements=256)
+    conn.row_factory = sqlite3.Row
+    # Tune once per connection: WAL lets get_key_info reads proceed while a
+    # write (create/revoke/update_last_used) is in flight, and NORMAL sync
+    # cuts fsync cost. Skip for in-memory databases where none of this applies.
+    if DB_PATH.name != ":memory:":
+        cur = conn.cursor()
+        cur.execute("PRAGMA journal_mode=WAL;")
+        cur.execute("PRAGMA synchronous=NORMAL;")
+        cur.execute("PRAGMA temp_store=MEMORY;")
+        cur.execute("PRAGMA mmap_size=268435456;")
+        cur.execute("PRAGMA cache_size=-20000;")
+        cur.close()
+    return conn
+
+
+class _SqlitePool:
+    """Small pool of long-lived SQLite connections for read queries.
+
+    Connecting per call pays connection setup plus a full SQL parse/plan on
+    every statement; persistent connections keep SQLite's page cache hot and
+    let the driver reuse its internal prepared-statement cache.
+    """
+
+    def __init__(self, size: int = 4):
+        self._size = size
+        self._lock = threading.Lock()
+        self._idle: List[sqlite3.Connection] = []
+
+    @contextmanager
+    def acquire(self) -> Iterator[sqlite3.Connection]:
+        with self._lock:
+            conn = self._idle.pop() if self._idle else _sqlite_open()
+        try:
+            yield conn
+        finally:
+            with self._lock:
+                if len(self._idle) < self._size:
+                    self._idle.append(conn)
+                else:
+                    conn.close()
+
+
+_pool = _SqlitePool()
+
+# Writes go through a single persistent connection so SQLite's writer lock is
+# taken in one place and write transactions never contend with each other.
+_writer_lock = threading.Lock()
+_writer_conn: Optional[sqlite3.Connection] = None
+
+
+@contextmanager
+def _sqlite_write() -> Iterator[sqlite3.Connection]:
+    global _writer_conn
+    with _writer_lock:
+        if _writer_conn is None:
+            _writer_conn = _sqlite_open()
+        yield _writer_conn
+
+
+# ---------- Postgres plumbing ----------
+
+def _ensure_psycopg():
+    global _psycopg
+    if _psycopg is None:
+        try:
+            import psycopg
+        except Exception as e:
+            raise RuntimeError("psycopg is required for Postgres support: install psycopg[binary,pool]") from e
+        _psycopg = psycopg
+    return _psycopg
+
+
+# Lazily built pool of persistent Postgres connections; connecting per call
+# costs a TCP/TLS handshake plus a server-side backend fork (often 5-20ms).
+_pg_pool = None
+_pg_pool_lock = threading.Lock()
+
+
+def _get_pg_pool():
+    global _pg_pool
+    if _pg_pool is None:
+        with _pg_pool_lock:
+            if _pg_pool is None:
+                _ensure_psycopg()
+                from psycopg.rows import dict_row
+                from psycopg_pool import ConnectionPool
+
+                # prepare_threshold promotes hot statements to server-side
+                # PREPARE with binary results after a few executions, skipping
+                # repeated planning; dict_row builds row dicts in C.
+                _pg_pool = ConnectionPool(
+                    DB_URL,
+                    min_size=1,
+                    max_size=settings.pg_pool_size,
+                    kwargs={"prepare_threshold": 5, "row_factory": dict_row},
+                )
+    return _pg_pool
+
+
+@contextmanager
+def _pg_conn():
+    pool = _get_pg_pool()
+    with pool.connection() as conn:
+        yield conn
+
+
+# ---------- Backends ----------
+#
+# The public functions below are written once; everything that genuinely
+# differs between SQLite and Postgres (paramstyle, connection plumbing, row
+# shape, schema setup, and the few operations with divergent SQL) lives on the
+# backend picked at module load.
+
+class _SqliteBackend:
+    paramstyle = "qmark"
+
+    def __init__(self):
+        self.sql = _SQL
+        # optional apsw connection for the auth hot path; apsw's statement
+        # cache keeps hot statements prepared with SQLITE_PREPARE_PERSISTENT,
+        # so repeated get_key_info queries skip the prepare step entirely
+        self._apsw_conn = None
+        self._apsw_lock = threading.Lock()
+
+    def _fetch_key_row_apsw(self, api_key: str):
+        with self._apsw_lock:
+            if self._apsw_conn is None:
+                self._apsw_conn = apsw.Connection(
+                    str(DB_PATH), flags=apsw.SQLITE_OPEN_READONLY, statementcachesize=64
+                )
+            cur = self._apsw_conn.cursor()
+            cur.execute(self.sql["select_key_by_hash"], (_key_hash(api_key),))
+            row = cur.fetchone()
+        if row is None:
+            return None
+        return dict(zip(_KEY_COLUMNS, row))
+
+    def ready(self) -> bool:
+        return DB_PATH.exists()
+
+    def read(self):
+        return _pool.acquire()
+
+    def write(self):
+        return _sqlite_write()
+
+    @staticmethod
+    def row_dict(row) -> Dict:
+        return {k: row[k] for k in row.keys()}
+
+    def ensure_initialized(self, seed: bool = False) -> None:
+        with self.write() as conn:
+            cur = conn.cursor()
+            cur.execute(
+                """
+                CREATE TABLE IF NOT EXISTS api_keys (
+                    api_key TEXT PRIMARY KEY,
+                    client_name TEXT NOT NULL,
+                    created_at TEXT NOT NULL,
+                    rate_limit INTEGER DEFAULT 60
+                );
+                """
+            )
+            conn.commit()
+
+            # Safe migrations: add lifecycle columns if missing. ALTER raises
+            # OperationalError when the column already exists, which is cheaper
+            # than a PRAGMA table_info round trip and Python list scan per column.
+            for name, decl in (
+                ("is_active", "INTEGER DEFAULT 1"),
+                ("revoked_at", "TEXT"),
+                ("last_used_at", "TEXT"),
+                ("api_key_hash", "BLOB"),
+            ):
+                try:
+                    cur.execute(f"ALTER TABLE api_keys ADD COLUMN {name} {decl};")
+                except sqlite3.OperationalError:
+                    pass
+            conn.commit()
+
+            # Backfill digests for rows created before the column existed, then
+            # index them so lookups go through the compact BLOB key.
+            cur.execute("SELECT api_key FROM api_keys WHERE api_key_hash IS NULL;")
+            missing = [r[0] for r in cur.fetchall()]
+            if missing:
+                cur.executemany(
+                    "UPDATE api_keys SET api_key_hash = ? WHERE api_key = ?;",
+                    [(_key_hash(k), k) for k in missing],
+                )
+            cur.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_api_key_hash ON api_keys(api_key_hash);")
+            conn.commit()
+
+            # Optional seed: only if requested and table empty
+            if seed:
+                cur.execute("SELECT COUNT(*) FROM api_keys;")
+                count = int(cur.fetchone()[0])
+                if count == 0:
+                    sample_key = "testkey123"
+                    now = _utc_now()
+                    cur.execute(
+                        """
+                        INSERT OR IGNORE INTO api_keys(api_key, api_key_hash, client_name, created_at, rate_limit, is_active)
+                        VALUES (?, ?, ?, ?, ?, 1);
+                        """,
+                        (sample_key, _key_hash(sample_key), "local-dev", now, 60),
+                    )
+                    conn.commit()
+
+    def fetch_key_row(self, api_key: str):
+        if not self.ready():
+            return None
+        if apsw is not None:
+            try:
+                return self._fetch_key_row_apsw(api_key)
+            except Exception:
+                # fall back to the stdlib driver (e.g. pre-migration schema)
+                pass
+        with self.read() as conn:
+            cur = conn.cursor()
+            try:
+                cur.execute(self.sql["select_key_by_hash"], (_key_hash(api_key),))
+            except sqlite3.OperationalError:
+                # pre-migration database without api_key_hash; fall back to text PK
+                cur.execute(self.sql["select_key"], (api_key,))
+            return cur.fetchone()
+
+    def rotate_key(self, old_api_key: str, new_key: str, now: str) -> Optional[Dict]:
+        with self.write() as conn:
+            cur = conn.cursor()
+            cur.execute("BEGIN IMMEDIATE;")
+            try:
+                cur.execute(self.sql["select_for_rotate"], (old_api_key,))
+                row = cur.fetchone()
+                if not row:
+                    conn.rollback()
+                    return None
+                client_name = row["client_name"]
+                rate_limit = int(row["rate_limit"] or 60)
+                cur.execute(self.sql["revoke_key"], (now, old_api_key))
+                cur.execute(self.sql["insert_key"], (new_key, _key_hash(new_key), client_name, now, rate_limit))
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+        return {
+            "api_key": new_key,
+            "client_name": client_name,
+            "created_at": now,
+            "rate_limit": rate_limit,
+            "is_active": 1,
+            "revoked_at": None,
+            "last_used_at": None,
+        }
+
+    def iter_keys(self, mask: bool = True) -> Iterator[Dict]:
+        if not self.ready():
+            return
+        with self.read() as conn:
+            cur = conn.cursor()
+            cur.execute(self.sql["list_keys"])
+            while True:
+                batch = cur.fetchmany(_LIST_KEYS_BATCH)
+                if not batch:
+                    break
+                for r in batch:
+                    d = self.row_dict(r)
+                    if mask:
+                        d["api_key"] = _mask_api_key(d["api_key"])
+                    yield d
+
+
+class _PgBackend:
+    paramstyle = "format"
+
+    def __init__(self):
+        # translate qmark placeholders once so every execute reuses the same
+        # interned string object (none of our SQL contains a literal '?')
+        self.sql = {name: q.replace("?", "%s") for name, q in _SQL.items()}
+
+    def ready(self) -> bool:
+        return True
+
+    def read(self):
+        return _pg_conn()
+
+    def write(self):
+        return _pg_conn()
+
+    @staticmethod
+    def row_dict(row) -> Dict:
+        return row  # dict_row: the driver already built the dict in C
+
+    def ensure_initialized(self, seed: bool = False) -> None:
+        with self.write() as conn:
+            cur = conn.cursor()
+            # Create table if not exists with necessary columns
+            cur.execute(
+                """
+                CREATE TABLE IF NOT EXISTS api_keys (
+                    api_key TEXT PRIMARY KEY,
+                    api_key_hash BYTEA,
+                    client_name TEXT NOT NULL,
+                    created_at TEXT NOT NULL,
+                    rate_limit INTEGER DEFAULT 60,
+                    is_active INTEGER DEFAULT 1,
+                    revoked_at TEXT,
+                    last_used_at TEXT
+                );
+                """
+            )
+            cur.execute("ALTER TABLE api_keys ADD COLUMN IF NOT EXISTS api_key_hash BYTEA;")
+            cur.execute("SELECT api_key FROM api_keys WHERE api_key_hash IS NULL;")
+            missing = [r["api_key"] for r in cur.fetchall()]
+            if missing:
+                cur.executemany(
+                    "UPDATE api_keys SET api_key_hash = %s WHERE api_key = %s;",
+                    [(_key_hash(k), k) for k in missing],
+                )
+            cur.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_api_key_hash ON api_keys(api_key_hash);")
+            conn.commit()
+            if seed:
+                cur.execute("SELECT COUNT(*) AS n FROM api_keys;")
+                count = int(cur.fetchone()["n"])
+                if count == 0:
+                    sample_key = "testkey123"
+                    now = _utc_now()
+                    cur.execute(
+                        "INSERT INTO api_keys(api_key, api_key_hash, client_name, created_at, rate_limit, is_active) VALUES (%s, %s, %s, %s, %s, 1) ON CONFLICT DO NOTHING;",
+                        (sample_key, _key_hash(sample_key), "local-dev", now, 60),
+                    )
+                    conn.commit()
+
+    def fetch_key_row(self, api_key: str):
+        with self.read() as conn:
+            cur = conn.cursor()
+            cur.execute(self.sql["select_key_by_hash"], (_key_hash(api_key),))
+            return cur.fetchone()
+
+    def rotate_key(self, old_api_key: str, new_key: str, now: str) -> Optional[Dict]:
+        with self.write() as conn:
+            cur = conn.cursor()
+            # CTE folds revoke + insert into a single server round trip
+            cur.execute(
+                """
+                WITH revoked AS (
+                    UPDATE api_keys SET revoked_at = %s, is_active = 0
+                    WHERE api_key = %s
+                    RETURNING client_name, rate_limit
+                )
+                INSERT INTO api_keys(api_key, api_key_hash, client_name, created_at, rate_limit, is_active, revoked_at, last_used_at)
+                SELECT %s, %s, client_name, %s, COALESCE(rate_limit, 60), 1, NULL, NULL FROM revoked
+                RETURNING api_key, client_name, created_at, rate_limit, is_active, revoked_at, last_used_at;
+                """,
+                (now, old_api_key, new_key, _key_hash(new_key), now),
+            )
+            row = cur.fetchone()
+            conn.commit()
+            return row if row else None
+
+    def iter_keys(self, mask: bool = True) -> Iterator[Dict]:
+        with self.read() as conn:
+            # named cursor => server-side cursor; rows stream in itersize batches
+            with conn.cursor(name="list_keys_cur") as cur:
+                cur.itersize = _LIST_KEYS_BATCH
+                cur.execute(self.sql["list_keys"])
+                for d in cur:
+                    if mask:
+                        d["api_key"] = _mask_api_key(d["api_key"])
+                    yield d
+
+
+_backend = _PgBackend() if DB_URL else _SqliteBackend()
+
+
+# ---------- Public API ----------
+
+# Schema setup only needs to run once per process; tests can reset this flag
+# to force a re-run against a fresh database path.
+_initialized = False
+
+
+def ensure_db_initialized(seed: bool = False) -> None:
+    global _initialized
+    if _initialized:
+        return
+    _backend.ensure_initialized(seed=seed)
+    _initialized = True
+
+
+# Auth traffic reuses a small set of API keys, so a short-TTL LRU cache turns
+# the hot lookup into a dict hit instead of a DB round trip. Negative results
+# are cached too. Lifecycle operations invalidate; the short TTL also bounds
+# staleness across workers in multi-process deployments.
+_KEY_CACHE_MAX = 1024
+_KEY_CACHE_TTL = 30.0
+_key_cache: "OrderedDict[str, tuple[Optional[Dict], float]]" = OrderedDict()
+_key_cache_lock = threading.Lock()
+
+
+def _key_cache_invalidate(api_key: str) -> None:
+    with _key_cache_lock:
+        _key_cache.pop(api_key, None)
+
+
+def get_key_info(api_key: str) -> Optional[Dict]:
+    """Return active key record dict, or None if missing/inactive/revoked.
+
+    Callers get a copy of the cached record: the cache entry is shared across
+    requests, and handing out the same dict would let one caller's mutation
+    leak into every later hit.
+    """
+    now = time.monotonic()
+    with _key_cache_lock:
+        hit = _key_cache.get(api_key)
+        if hit is not None and hit[1] > now:
+            _key_cache.move_to_end(api_key)
+            return dict(hit[0]) if hit[0] is not None else None
+    record = _get_key_info_uncached(api_key)
+    with _key_cache_lock:
+        _key_cache[api_key] = (record, now + _KEY_CACHE_TTL)
+        _key_cache.move_to_end(api_key)
+        while len(_key_cache) > _KEY_CACHE_MAX:
+            _key_cache.popitem(last=False)
+    return dict(record) if record is not None else None
+
+
+def _get_key_info_uncached(api_key: str) -> Optional[Dict]:
+    row = _backend.fetch_key_row(api_key)
+    if not row:
+        return None
+    d = _backend.row_dict(row)
+    if int(d.get("is_active") or 0) != 1:
+        return None
+    if d.get("revoked_at"):
+        return None
+    return d
+
+
+def touch_and_get(api_key: str) -> Optional[Dict]:
+    """Return the active key record and stamp last_used_at, or None.
+
+    The lookup happens inline; the last_used_at write is coalesced into the
+    debounce buffer rather than issuing a write transaction per request.
+    """
+    info = get_key_info(api_key)
+    if info is not None:
+        update_last_used(api_key)
+    return info
+
+
+async def get_key_info_async(api_key: str) -> Optional[Dict]:
+    """Async variant of get_key_info; see touch_and_get_async."""
+    import anyio
+
+    return await anyio.to_thread.run_sync(get_key_info, api_key)
+
+
+async def touch_and_get_async(api_key: str) -> Optional[Dict]:
+    """Async variant of touch_and_get for event-loop callers.
+
+    The drivers here are synchronous, so the lookup runs on a worker thread
+    via anyio; the event loop keeps serving other requests for the duration
+    of the DB call instead of blocking on it.
+    """
+    import anyio
+
+    return await anyio.to_thread.run_sync(touch_and_get, api_key)
+
+
+# last_used_at only needs eventual accuracy, so writes are coalesced in
+# memory and flushed periodically as one batched transaction instead of a
+# write transaction (and fsync) per authenticated request. The app drives
+# flush_last_used() from a background task on startup; atexit catches
+# whatever is still buffered at shutdown.
+_last_used_buffer: Dict[str, str] = {}
+_last_used_lock = threading.Lock()
+
+
+def update_last_used(api_key: str) -> None:
+    with _last_used_lock:
+        _last_used_buffer[api_key] = _utc_now()
+
+
+def flush_last_used() -> None:
+    """Write buffered last_used_at stamps in one batched transaction."""
+    with _last_used_lock:
+        if not _last_used_buffer:
+            return
+        items = [(ts, k) for k, ts in _last_used_buffer.items()]
+        _last_used_buffer.clear()
+    if not _backend.ready():
+        return
+    try:
+        with _backend.write() as conn:
+            try:
+                cur = conn.cursor()
+                cur.executemany(_backend.sql["update_last_used"], items)
+                conn.commit()
+            except Exception:
+                # roll back so the long-lived writer connection isn't left
+                # holding an open transaction with partial updates that the
+                # next unrelated write would commit
+                conn.rollback()
+                raise
+    except Exception:
+        # best-effort tracking: a failed flush is dropped, newer timestamps
+        # will be written on the next flush
+        pass
+
+
+atexit.register(flush_last_used)
+
+
+def create_key(client_name: str, rate_limit: int = 60) -> Dict:
+    api_key = secrets.token_urlsafe(32)
+    now = _utc_now()
+    _key_cache_invalidate(api_key)
+    with _backend.write() as conn:
+        cur = conn.cursor()
+        cur.execute(_backend.sql["insert_key"], (api_key, _key_hash(api_key), client_name, now, int(rate_limit)))
+        conn.commit()
+    return {
+        "api_key": api_key,
+        "client_name": client_name,
+        "created_at": now,
+        "rate_limit": int(rate_limit),
+        "is_active": 1,
+        "revoked_at": None,
+        "last_used_at": None,
+    }
+
+
+def revoke_key(api_key: str) -> bool:
+    _key_cache_invalidate(api_key)
+    with _backend.write() as conn:
+        cur = conn.cursor()
+        cur.execute(_backend.sql["revoke_key"], (_utc_now(), api_key))
+        conn.commit()
+        return cur.rowcount > 0
+
+
+def set_key_active(api_key: str, active: bool) -> bool:
+    _key_cache_invalidate(api_key)
+    with _backend.write() as conn:
+        cur = conn.cursor()
+        cur.execute(_backend.sql["set_active"], (1 if active else 0, api_key))
+        conn.commit()
+        return cur.rowcount > 0
+
+
+def rotate_key(old_api_key: str) -> Optional[Dict]:
+    # revoke the old key and insert its replacement atomically, in one
+    # transaction on one connection
+    _key_cache_invalidate(old_api_key)
+    new_key = secrets.token_urlsafe(32)
+    now = _utc_now()
+    return _backend.rotate_key(old_api_key, new_key, now)
+
+
+def iter_keys(mask: bool = True) -> Iterator[Dict]:
+    """Yield key records incrementally instead of materializing them all.
+
+    Memory stays bounded at _LIST_KEYS_BATCH rows regardless of table size;
+    Postgres streams through a server-side (named) cursor, SQLite through
+    fetchmany batches.
+    """
+    yield from _backend.iter_keys(mask=mask)
+
+
+def list_keys(mask: bool = True) -> List[Dict]:
+    # backward-compatible wrapper for callers that want the full list
+    return list(iter_keys(mask=mask))
@@ -1,328 +1,471 @@
-from __future__ import annotations
-
-import logging
-import time
-import uuid
-from fastapi import FastAPI, HTTPException, Request, Security
-from fastapi.responses import JSONResponse
-from fastapi.security.api_key import APIKeyHeader
-from fastapi.exceptions import RequestValidationError
-from fastapi.openapi.utils import get_openapi
-
-from config import get_settings
-from responses import ok, fail, Envelope
-from metrics import inc_requests, inc_errors, inc_rate_limited, inc_auth_failed, snapshot
-from rate_limiter import build_limiter
-
-from db import get_coupon_by_drug, list_coupons, count_coupons
-from auth_db import (
-    ensure_db_initialized,
-    get_key_info,
-    update_last_used,
-    list_keys,
-    create_key,
-    revoke_key,
-    set_key_active,
-    rotate_key,
-)
-from pydantic import BaseModel
-
-settings = get_settings()
-
-app = FastAPI(title="Copay programs API", version="0.2.0")
-
-class CouponRequest(BaseModel):
-    drug: str
-    insurance_type: str
-    coverage_status: str
-    state: str
-    days_supply: int
-    quantity: int
-    uom: str
-    strength: str
-    quantity: int
-
-@app.on_event("startup")
-def startup():
-    try:
-        ensure_db_initialized(seed=settings.seed_dev_key)
-    except Exception as e:
-        logger.exception("DB init failed: %s", e)
-
-logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
-logger = logging.getLogger("goodrx_api")
-
-api_key_header = APIKeyHeader(
-    name="x-api-key",
-    auto_error=False,
-    scheme_name="ApiKeyAuth",   # use stable OpenAPI scheme id
-)
-
-admin_key_header = APIKeyHeader(
-    name="x-admin-key",
-    auto_error=False,
-    scheme_name="AdminKeyAuth", # use stable OpenAPI scheme id
-)
-
-
-RATE_PERIOD = 60  # seconds
-limiter = build_limiter(settings.redis_url)
-
-
-def _rid(request: Request) -> str:
-    return getattr(request.state, "request_id", "-")
-
-
-def _mask_key(k: str) -> str:
-    if not k:
-        return "-"
-    return ("*" * max(0, len(k) - 4)) + k[-4:]
-
-
-@app.middleware("http")
-async def request_id_and_logging(request: Request, call_next):
-    """First middleware: generate request_id, store it on request.state, add x-request-id header,
-    and emit a structured log line after the response is produced.
-
-    Important: do not log headers, query params, or API keys here.
-    """
-    inc_requests()
-    # create request id and attach to request.state
-    request_id = str(uuid.uuid4())
-    request.state.request_id = request_id
-
-    start = time.time()
-    response = None
-    try:
-        response = await call_next(request)
-        # ensure x-request-id present on all responses
-        try:
-            response.headers["x-request-id"] = request_id
-        except Exception:
-            # best-effort: don't break responses if headers aren't writable
-            pass
-        return response
-    except Exception:
-        inc_errors()
-        raise
-    finally:
-        duration_ms = round((time.time() - start) * 1000, 3)
-        status = getattr(response, "status_code", "-")
-        # Structured, minimal log line; avoid logging headers or query params
-        logger.info(
-            "request_id=%s method=%s path=%s status=%s duration_ms=%s",
-            request_id,
-            request.method,
-            request.url.path,
-            status,
-            duration_ms,
-        )
-
-
-@app.exception_handler(HTTPException)
-async def http_exception_handler(request: Request, exc: HTTPException):
-    inc_errors()
-    env = fail(
-        request_id=_rid(request),
-        code=int(exc.status_code),
-        message=str(exc.detail),
-        error_type="http_error",
-        details=None,
-    )
-    return JSONResponse(status_code=int(exc.status_code), content=env.model_dump())
-
-
-@app.exception_handler(RequestValidationError)
-async def validation_exception_handler(request: Request, exc: RequestValidationError):
-    inc_errors()
-    env = fail(
-        request_id=_rid(request),
-        code=422,
-        message="Validation error",
-        error_type="validation_error",
-        details=exc.errors(),
-    )
-    return JSONResponse(status_code=422, content=env.model_dump())
-
-
-@app.exception_handler(Exception)
-async def unhandled_exception_handler(request: Request, exc: Exception):
-    inc_errors()
-    # Avoid leaking internals in prod
-    msg = "Server error" if settings.env == "prod" else f"Server error: {exc}"
-    env = fail(_rid(request), 500, msg, "server_error")
-    return JSONResponse(status_code=500, content=env.model_dump())
-
-
-def require_api_key(request: Request, api_key: str = Security(api_key_header)) -> dict:
-    if not api_key:
-        inc_auth_failed()
-        raise HTTPException(status_code=401, detail="Missing API key")
-    info = get_key_info(api_key)
-    if not info:
-        inc_auth_failed()
-        raise HTTPException(status_code=401, detail="Invalid API key")
-
-    # store on request.state; never log full key
-    request.state.api_key = api_key
-    request.state.client_name = info.get("client_name")
-    request.state.rate_limit = int(info.get("rate_limit") or 60)
-
-    # best-effort last_used tracking
-    try:
-        update_last_used(api_key)
-    except Exception:
-        pass
-
-    return info
-
-
-def require_admin(request: Request, admin_key: str = Security(admin_key_header)) -> None:
-    if not settings.admin_api_key:
-        raise HTTPException(status_code=503, detail="Admin API key not configured")
-    if not admin_key or admin_key != settings.admin_api_key:
-        raise HTTPException(status_code=403, detail="Forbidden")
-
-
-@app.middleware("http")
-async def rate_limit_middleware(request: Request, call_next):
-    # Public endpoints not rate limited
-    public_prefixes = ("/docs", "/openapi.json", "/redoc", "/favicon.ico", "/healthz", "/readyz")
-    if request.url.path.startswith(public_prefixes) or request.method == "OPTIONS":
-        return await call_next(request)
-
-    # Require API key for all non-public endpoints (single source of truth: dependency)
-    # We cannot call dependency here; instead, we rate limit only if state has api_key.
-    # Endpoints themselves require require_api_key; if missing, they'll 401.
-    api_key = getattr(request.state, "api_key", None)
-    rate_limit = getattr(request.state, "rate_limit", 60)
-
-    # If state isn't set yet, just proceed; endpoint dependency will set and can be rate-limited on next call.
-    # (If you want strict rate limiting for every call, move to dependency-based limiter.)
-    if api_key:
-        decision = limiter.allow(api_key, limit=int(rate_limit), period=RATE_PERIOD)
-        if not decision.allowed:
-            inc_rate_limited()
-            env = fail(_rid(request), 429, "Rate limit exceeded", "rate_limited")
-            return JSONResponse(status_code=429, content=env.model_dump())
-
-    return await call_next(request)
-
-
-@app.get("/healthz", response_model=Envelope)
-def healthz(request: Request):
-    return ok(_rid(request), data={"status": "ok"})
-
-
-@app.get("/readyz", response_model=Envelope)
-def readyz(request: Request):
-    # checks: DB files exist and basic queries succeed
-    try:
-        # auth DB exists
-        _ = settings.api_keys_db_path.exists()
-        # coupons DB exists and readable
-        _ = settings.coupons_db_path.exists()
-        # sanity query
-        _ = count_coupons()
-    except Exception as e:
-        env = fail(_rid(request), 503, "Not ready", "not_ready", details=str(e) if settings.env != "prod" else None)
-        return JSONResponse(status_code=503, content=env.model_dump())
-    return ok(_rid(request), data={"status": "ready"})
-
-
-@app.get("/metrics", response_model=Envelope)
-def metrics_endpoint(request: Request):
-    return ok(_rid(request), data=snapshot())
-
-
-@app.post("/v1/drug-affordability", response_model=Envelope)
-def read_drug_affordability(request_body: CouponRequest, request: Request, _keyinfo: dict = Security(require_api_key)):
-    row = get_coupon_by_drug(request_body.drug)
-    if not row:
-        env = fail(_rid(request), 404, "Drug affordability not found", "not_found")
-        return JSONResponse(status_code=404, content=env.model_dump())
-    # expose only ai_extraction (and id) to callers
-    data = {"id": row.get("id"), "ai_extraction": row.get("ai_extraction")}
-    return ok(_rid(request), data=data)
-
-
-@app.get("/coupons", response_model=Envelope)
-def list_drugs_affordability_endpoint(
-    request: Request,
-    page: int = 1,
-    per_page: int = 50,
-    drug_name: str | None = None,
-    _keyinfo: dict = Security(require_api_key),
-):
-    per_page = min(max(1, per_page), 500)
-    page = max(1, page)
-    offset = (page - 1) * per_page
-
-    items = list_coupons(limit=per_page, offset=offset, drug_name=drug_name)
-    total = count_coupons(drug_name=drug_name)
-
-    # expose only id and ai_extraction in items
-    items_out = [{"id": r.get("id"), "ai_extraction": r.get("ai_extraction")} for r in items]
-
-    meta = {"page": page, "per_page": per_page, "total": total, "drug_name": drug_name}
-    return ok(_rid(request), data={"items": items_out, "meta": meta})
-
-
-# -------------------------
-# Admin endpoints (internal)
-# -------------------------
-
-@app.get("/admin/keys", response_model=Envelope)
-def admin_list_keys(request: Request, _admin: None = Security(require_admin)):
-    return ok(_rid(request), data={"keys": list_keys(mask=True)})
-
-
-@app.post("/admin/keys", response_model=Envelope)
-def admin_create_key(request: Request, client_name: str, rate_limit: int = 60, _admin: None = Security(require_admin)):
-    created = create_key(client_name=client_name, rate_limit=rate_limit)
-    # return full key only here (admin); caller must store it
-    return ok(_rid(request), data=created, message="Key created", code=201)
-
-
-@app.post("/admin/keys/{api_key}/revoke", response_model=Envelope)
-def admin_revoke_key(request: Request, api_key: str, _admin: None = Security(require_admin)):
-    if not revoke_key(api_key):
-        env = fail(_rid(request), 404, "Key not found", "not_found")
-        return JSONResponse(status_code=404, content=env.model_dump())
-    return ok(_rid(request), data={"revoked": True})
-
-
-@app.post("/admin/keys/{api_key}/activate", response_model=Envelope)
-def admin_activate_key(request: Request, api_key: str, active: bool, _admin: None = Security(require_admin)):
-    if not set_key_active(api_key, active=active):
-        env = fail(_rid(request), 404, "Key not found", "not_found")
-        return JSONResponse(status_code=404, content=env.model_dump())
-    return ok(_rid(request), data={"active": active})
-
-
-@app.post("/admin/keys/{api_key}/rotate", response_model=Envelope)
-def admin_rotate_key(request: Request, api_key: str, _admin: None = Security(require_admin)):
-    new_key = rotate_key(api_key)
-    if not new_key:
-        env = fail(_rid(request), 404, "Key not found", "not_found")
-        return JSONResponse(status_code=404, content=env.model_dump())
-    return ok(_rid(request), data=new_key, message="Key rotated")
-
-
-# Expose both API key security schemes in OpenAPI so Swagger's Authorize shows them.
-def custom_openapi():
-    if app.openapi_schema:
-        return app.openapi_schema
-    openapi_schema = get_openapi(title=app.title, version=app.version, routes=app.routes)
-    comps = openapi_schema.setdefault("components", {})
-    schemes = comps.setdefault("securitySchemes", {})
-    # register schemes using the same ids as the APIKeyHeader.scheme_name values
-    schemes["ApiKeyAuth"] = {"type": "apiKey", "in": "header", "name": "x-api-key", "description": "Client API key"}
-    schemes["AdminKeyAuth"] = {"type": "apiKey", "in": "header", "name": "x-admin-key", "description": "Admin API key"}
-    app.openapi_schema = openapi_schema
-    return app.openapi_schema
-
-app.openapi = custom_openapi
-
-
-# NOTE: Removed developer-only /whoami and /_debug/header endpoints as requested.
+from __future__ import annotations
+
+import asyncio
+import logging
+import re
+import time
+import uuid
+from urllib.parse import parse_qs
+from fastapi import FastAPI, HTTPException, Request, Response, Security
+from fastapi.responses import ORJSONResponse
+from fastapi.security.api_key import APIKeyHeader
+from fastapi.exceptions import RequestValidationError
+from fastapi.openapi.utils import get_openapi
+
+from config import get_settings
+from responses import ok, fail, Envelope
+from metrics import inc_requests, inc_errors, inc_rate_limited, inc_auth_failed, snapshot
+from rate_limiter import build_limiter
+
+from db import get_coupon_by_drug, list_coupons, count_coupons, ping_coupons_db
+from auth_db import (
+    ensure_db_initialized,
+    flush_last_used,
+    touch_and_get_async,
+    list_keys,
+    create_key,
+    revoke_key,
+    set_key_active,
+    rotate_key,
+)
+from pydantic import BaseModel
+
+try:
+    from pyinstrument import Profiler  # type: ignore
+except Exception:  # pragma: no cover
+    Profiler = None
+
+settings = get_settings()
+
+# ORJSONResponse serializes the (sometimes large) envelope bodies with orjson
+# instead of stdlib json; biggest win on the list endpoint's payloads.
+app = FastAPI(title="Copay programs API", version="0.2.0", default_response_class=ORJSONResponse)
+
+class CouponRequest(BaseModel):
+    drug: str
+    insurance_type: str
+    coverage_status: str
+    state: str
+    days_supply: int
+    quantity: int
+    uom: str
+    strength: str
+    quantity: int
+
+# last_used_at stamps are buffered in auth_db; drain them off the request
+# path every few seconds (one batched transaction instead of a write per
+# authenticated request).
+LAST_USED_FLUSH_SECONDS = 5.0
+_last_used_flusher: asyncio.Task | None = None
+
+
+async def _flush_last_used_loop():
+    while True:
+        await asyncio.sleep(LAST_USED_FLUSH_SECONDS)
+        await asyncio.to_thread(flush_last_used)
+
+
+@app.on_event("startup")
+async def startup():
+    global _last_used_flusher
+    try:
+        ensure_db_initialized(seed=settings.seed_dev_key)
+    except Exception as e:
+        logger.exception("DB init failed: %s", e)
+    _last_used_flusher = asyncio.create_task(_flush_last_used_loop())
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    if _last_used_flusher is not None:
+        _last_used_flusher.cancel()
+    # drain anything still buffered
+    await asyncio.to_thread(flush_last_used)
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+logger = logging.getLogger("goodrx_api")
+
+api_key_header = APIKeyHeader(
+    name="x-api-key",
+    auto_error=False,
+    scheme_name="ApiKeyAuth",   # use stable OpenAPI scheme id
+)
+
+admin_key_header = APIKeyHeader(
+    name="x-admin-key",
+    auto_error=False,
+    scheme_name="AdminKeyAuth", # use stable OpenAPI scheme id
+)
+
+
+RATE_PERIOD = 60  # seconds
+limiter = build_limiter(settings.redis_url)
+
+# Public endpoints exempt from rate limiting. Checked on every request, so
+# one precompiled C-level regex match beats six startswith calls per call.
+_PUBLIC_RE = re.compile(r"^/(docs|openapi\.json|redoc|favicon\.ico|healthz|readyz)")
+
+
+def _rid(request: Request) -> str:
+    return getattr(request.state, "request_id", "-")
+
+
+class RequestIDMiddleware:
+    """Generate request_id, stash it on scope state, add the x-request-id
+    header, and emit a structured log line after the response is produced.
+
+    Written as pure ASGI rather than @app.middleware("http"): that decorator
+    wraps every request in BaseHTTPMiddleware, whose extra Request/Response
+    allocations and internal queue cost measurable latency on every call.
+    scope["state"] entries surface as request.state attributes downstream.
+
+    Important: do not log headers, query params, or API keys here.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        inc_requests()
+        # read scope once; repeated subscript lookups add up at 100% request
+        # coverage
+        method = scope["method"]
+        path = scope["path"]
+        request_id = uuid.uuid4().hex
+        scope.setdefault("state", {})["request_id"] = request_id
+        rid_header = (b"x-request-id", request_id.encode())
+        status_seen = {"status": "-"}
+
+        async def send_with_request_id(message):
+            if message["type"] == "http.response.start":
+                status_seen["status"] = message["status"]
+                message.setdefault("headers", []).append(rid_header)
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_request_id)
+        except Exception:
+            inc_errors()
+            raise
+        finally:
+            duration_ms = round((time.perf_counter() - start) * 1000, 3)
+            # Structured, minimal log line; avoid logging headers or query params
+            logger.info(
+                "request_id=%s method=%s path=%s status=%s duration_ms=%s",
+                request_id,
+                method,
+                path,
+                status_seen["status"],
+                duration_ms,
+            )
+
+
+@app.exception_handler(HTTPException)
+async def http_exception_handler(request: Request, exc: HTTPException):
+    inc_errors()
+    env = fail(
+        request_id=_rid(request),
+        code=int(exc.status_code),
+        message=str(exc.detail),
+        error_type="http_error",
+        details=None,
+    )
+    return Response(content=env.model_dump_json(), status_code=int(exc.status_code), media_type="application/json")
+
+
+@app.exception_handler(RequestValidationError)
+async def validation_exception_handler(request: Request, exc: RequestValidationError):
+    inc_errors()
+    env = fail(
+        request_id=_rid(request),
+        code=422,
+        message="Validation error",
+        error_type="validation_error",
+        details=exc.errors(),
+    )
+    return Response(content=env.model_dump_json(), status_code=422, media_type="application/json")
+
+
+@app.exception_handler(Exception)
+async def unhandled_exception_handler(request: Request, exc: Exception):
+    inc_errors()
+    # Avoid leaking internals in prod
+    msg = "Server error" if settings.env == "prod" else f"Server error: {exc}"
+    env = fail(_rid(request), 500, msg, "server_error")
+    return Response(content=env.model_dump_json(), status_code=500, media_type="application/json")
+
+
+async def require_api_key(request: Request, api_key: str = Security(api_key_header)) -> dict:
+    if not api_key:
+        inc_auth_failed()
+        raise HTTPException(status_code=401, detail="Missing API key")
+    # async: the DB lookup runs on a worker thread, not the event loop
+    info = await touch_and_get_async(api_key)
+    if not info:
+        inc_auth_failed()
+        raise HTTPException(status_code=401, detail="Invalid API key")
+
+    # store on request.state; never log full key
+    request.state.api_key = api_key
+    request.state.client_name = info.get("client_name")
+    request.state.rate_limit = int(info.get("rate_limit") or 60)
+
+    return info
+
+
+def require_admin(request: Request, admin_key: str = Security(admin_key_header)) -> None:
+    if not settings.admin_api_key:
+        raise HTTPException(status_code=503, detail="Admin API key not configured")
+    if not admin_key or admin_key != settings.admin_api_key:
+        raise HTTPException(status_code=403, detail="Forbidden")
+
+
+class RateLimitMiddleware:
+    """Pure ASGI rate limiter keyed by the API key on scope state.
+
+    Public endpoints are not rate limited. We cannot call the auth dependency
+    here (single source of truth stays with require_api_key); instead we rate
+    limit only if state already carries an api_key. If state isn't set yet we
+    just proceed; the endpoint dependency will set it and the key can be
+    rate-limited on the next call. (For strict per-call limiting, move to a
+    dependency-based limiter.)
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        path = scope["path"]
+        if _PUBLIC_RE.match(path) or scope["method"] == "OPTIONS":
+            await self.app(scope, receive, send)
+            return
+
+        state = scope.setdefault("state", {})
+        api_key = state.get("api_key")
+        rate_limit = state.get("rate_limit", 60)
+
+        if api_key:
+            decision = await limiter.allow(api_key, limit=int(rate_limit), period=RATE_PERIOD)
+            if not decision.allowed:
+                inc_rate_limited()
+                env = fail(state.get("request_id", "-"), 429, "Rate limit exceeded", "rate_limited")
+                body = env.model_dump_json().encode()
+                await send(
+                    {
+                        "type": "http.response.start",
+                        "status": 429,
+                        "headers": [
+                            (b"content-type", b"application/json"),
+                            (b"content-length", str(len(body)).encode()),
+                        ],
+                    }
+                )
+                await send({"type": "http.response.body", "body": body})
+                return
+
+        await self.app(scope, receive, send)
+
+
+class ProfilingMiddleware:
+    """Opt-in per-request profiling: non-prod requests carrying ?profile=1 get
+    back a pyinstrument HTML report of the request instead of the normal
+    response. This is the measurement lever for ranking hot spots (endpoint
+    code vs IO vs validation vs serialization); it is a no-op when
+    pyinstrument isn't installed or env is prod.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    @staticmethod
+    def _profile_requested(query_string: bytes) -> bool:
+        # cheap substring pre-filter, then an exact parameter match: a bare
+        # substring test would also fire on ?noprofile=1, ?profile=10, or a
+        # value that merely contains the byte sequence
+        if b"profile=1" not in query_string:
+            return False
+        return parse_qs(query_string).get(b"profile") == [b"1"]
+
+    async def __call__(self, scope, receive, send):
+        if (
+            scope["type"] != "http"
+            or Profiler is None
+            or settings.env == "prod"
+            or not self._profile_requested(scope.get("query_string", b""))
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        profiler = Profiler(interval=0.001, async_mode="enabled")
+        profiler.start()
+
+        async def swallow_response(message):
+            # the profile report replaces the downstream response
+            return
+
+        try:
+            await self.app(scope, receive, swallow_response)
+        finally:
+            profiler.stop()
+
+        body = profiler.output_html().encode()
+        await send(
+            {
+                "type": "http.response.start",
+                "status": 200,
+                "headers": [
+                    (b"content-type", b"text/html; charset=utf-8"),
+                    (b"content-length", str(len(body)).encode()),
+                ],
+            }
+        )
+        await send({"type": "http.response.body", "body": body})
+
+
+# add_middleware prepends, so RateLimitMiddleware runs outside
+# RequestIDMiddleware (matching the order the decorator-based middlewares
+# had) and ProfilingMiddleware runs outermost so a profile covers the whole
+# middleware chain.
+app.add_middleware(RequestIDMiddleware)
+app.add_middleware(RateLimitMiddleware)
+app.add_middleware(ProfilingMiddleware)
+
+
+@app.get("/healthz", response_model=Envelope)
+def healthz(request: Request):
+    return ok(_rid(request), data={"status": "ok"})
+
+
+# Probes arrive every few seconds forever; remember a good result briefly so
+# bursts don't hit the DB. Failures are never cached — a broken DB is
+# re-checked on every probe.
+READYZ_TTL_SECONDS = 5.0
+_readyz_ok_until = 0.0
+
+
+@app.get("/readyz", response_model=Envelope)
+def readyz(request: Request):
+    global _readyz_ok_until
+    if time.monotonic() < _readyz_ok_until:
+        return ok(_rid(request), data={"status": "ready"})
+    # checks: DB files exist and basic queries succeed
+    try:
+        # auth DB exists
+        _ = settings.api_keys_db_path.exists()
+        # coupons DB exists and readable
+        _ = settings.coupons_db_path.exists()
+        # O(1) sentinel instead of a COUNT(*) full scan
+        _ = ping_coupons_db()
+    except Exception as e:
+        env = fail(_rid(request), 503, "Not ready", "not_ready", details=str(e) if settings.env != "prod" else None)
+        return Response(content=env.model_dump_json(), status_code=503, media_type="application/json")
+    _readyz_ok_until = time.monotonic() + READYZ_TTL_SECONDS
+    return ok(_rid(request), data={"status": "ready"})
+
+
+@app.get("/metrics", response_model=Envelope)
+def metrics_endpoint(request: Request):
+    return ok(_rid(request), data=snapshot())
+
+
+@app.post("/v1/drug-affordability", response_model=Envelope)
+def read_drug_affordability(request_body: CouponRequest, request: Request, _keyinfo: dict = Security(require_api_key)):
+    row = get_coupon_by_drug(request_body.drug)
+    if not row:
+        env = fail(_rid(request), 404, "Drug affordability not found", "not_found")
+        return Response(content=env.model_dump_json(), status_code=404, media_type="application/json")
+    # expose only ai_extraction (and id) to callers
+    data = {"id": row.get("id"), "ai_extraction": row.get("ai_extraction")}
+    return ok(_rid(request), data=data)
+
+
+@app.get("/coupons", response_model=Envelope)
+def list_drugs_affordability_endpoint(
+    request: Request,
+    page: int = 1,
+    per_page: int = 50,
+    drug_name: str | None = None,
+    _keyinfo: dict = Security(require_api_key),
+):
+    per_page = min(max(1, per_page), 500)
+    page = max(1, page)
+    offset = (page - 1) * per_page
+
+    # normalize the filter once so items and total are computed from the same
+    # pattern (count_coupons normalizes internally; the list query must match)
+    drug_filter = (drug_name or "").strip().lower() or None
+
+    # list_coupons yields rows already shaped as {"id", "ai_extraction"}
+    items = list(list_coupons(limit=per_page, offset=offset, drug_name=drug_filter))
+    total = count_coupons(drug_name=drug_filter)
+
+    meta = {"page": page, "per_page": per_page, "total": total, "drug_name": drug_name}
+    return ok(_rid(request), data={"items": items, "meta": meta})
+
+
+# -------------------------
+# Admin endpoints (internal)
+# -------------------------
+
+@app.get("/admin/keys", response_model=Envelope)
+def admin_list_keys(request: Request, _admin: None = Security(require_admin)):
+    return ok(_rid(request), data={"keys": list_keys(mask=True)})
+
+
+@app.post("/admin/keys", response_model=Envelope)
+def admin_create_key(request: Request, client_name: str, rate_limit: int = 60, _admin: None = Security(require_admin)):
+    created = create_key(client_name=client_name, rate_limit=rate_limit)
+    # return full key only here (admin); caller must store it
+    return ok(_rid(request), data=created, message="Key created", code=201)
+
+
+@app.post("/admin/keys/{api_key}/revoke", response_model=Envelope)
+def admin_revoke_key(request: Request, api_key: str, _admin: None = Security(require_admin)):
+    if not revoke_key(api_key):
+        env = fail(_rid(request), 404, "Key not found", "not_found")
+        return Response(content=env.model_dump_json(), status_code=404, media_type="application/json")
+    return ok(_rid(request), data={"revoked": True})
+
+
+@app.post("/admin/keys/{api_key}/activate", response_model=Envelope)
+def admin_activate_key(request: Request, api_key: str, active: bool, _admin: None = Security(require_admin)):
+    if not set_key_active(api_key, active=active):
+        env = fail(_rid(request), 404, "Key not found", "not_found")
+        return Response(content=env.model_dump_json(), status_code=404, media_type="application/json")
+    return ok(_rid(request), data={"active": active})
+
+
+@app.post("/admin/keys/{api_key}/rotate", response_model=Envelope)
+def admin_rotate_key(request: Request, api_key: str, _admin: None = Security(require_admin)):
+    new_key = rotate_key(api_key)
+    if not new_key:
+        env = fail(_rid(request), 404, "Key not found", "not_found")
+        return Response(content=env.model_dump_json(), status_code=404, media_type="application/json")
+    return ok(_rid(request), data=new_key, message="Key rotated")
+
+
+# Expose both API key security schemes in OpenAPI so Swagger's Authorize shows them.
+def custom_openapi():
+    if app.openapi_schema:
+        return app.openapi_schema
+    openapi_schema = get_openapi(title=app.title, version=app.version, routes=app.routes)
+    comps = openapi_schema.setdefault("components", {})
+    schemes = comps.setdefault("securitySchemes", {})
+    # register schemes using the same ids as the APIKeyHeader.scheme_name values
+    schemes["ApiKeyAuth"] = {"type": "apiKey", "in": "header", "name": "x-api-key", "description": "Client API key"}
+    schemes["AdminKeyAuth"] = {"type": "apiKey", "in": "header", "name": "x-admin-key", "description": "Admin API key"}
+    app.openapi_schema = openapi_schema
+    return app.openapi_schema
+
+app.openapi = custom_openapi
+
+
+# NOTE: Removed developer-only /whoami and /_debug/header endpoints as requested.
@@ -1,45 +1,42 @@
-from __future__ import annotations
-from dataclasses import dataclass
-from threading import Lock
-
-
-@dataclass
-class Counters:
-    requests_total: int = 0
-    errors_total: int = 0
-    rate_limited_total: int = 0
-    auth_failed_total: int = 0
-
-
-_lock = Lock()
-_counters = Counters()
-
-
-def inc_requests() -> None:
-    with _lock:
-        _counters.requests_total += 1
-
-
-def inc_errors() -> None:
-    with _lock:
-        _counters.errors_total += 1
-
-
-def inc_rate_limited() -> None:
-    with _lock:
-        _counters.rate_limited_total += 1
-
-
-def inc_auth_failed() -> None:
-    with _lock:
-        _counters.auth_failed_total += 1
-
-
-def snapshot() -> dict:
-    with _lock:
-        return {
-            "requests_total": _counters.requests_total,
-            "errors_total": _counters.errors_total,
-            "rate_limited_total": _counters.rate_limited_total,
-            "auth_failed_total": _counters.auth_failed_total,
-        }
+from __future__ import annotations
+from itertools import count
+
+# Lock-free counters: next() on itertools.count is a single C call and atomic
+# under the GIL, so increments from any thread never contend on a lock the way
+# the previous Lock-guarded dataclass did. next() returns the pre-increment
+# value, so the number of completed increments is current + 1.
+_requests = count()
+_errors = count()
+_rate_limited = count()
+_auth_failed = count()
+
+
+def _value(c: count) -> int:
+    # count objects expose their current value through __reduce__ (the args
+    # that would rebuild them); there is no public accessor.
+    return c.__reduce__()[1][0]
+
+
+def inc_requests() -> None:
+    next(_requests)
+
+
+def inc_errors() -> None:
+    next(_errors)
+
+
+def inc_rate_limited() -> None:
+    next(_rate_limited)
+
+
+def inc_auth_failed() -> None:
+    next(_auth_failed)
+
+
+def snapshot() -> dict:
+    return {
+        "requests_total": _value(_requests),
+        "errors_total": _value(_errors),
+        "rate_limited_total": _value(_rate_limited),
+        "auth_failed_total": _value(_auth_failed),
+    }
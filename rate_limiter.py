@@ -1,100 +1,123 @@
-from __future__ import annotations
-import time
-from collections import defaultdict
-from dataclasses import dataclass
-from typing import Optional
-
-try:
-    import redis  # type: ignore
-except Exception:  # pragma: no cover
-    redis = None
-
-
-@dataclass
-class RateLimitDecision:
-    allowed: bool
-    remaining: int
-
-
-class InMemoryTokenBucket:
-    def __init__(self):
-        self._buckets = defaultdict(lambda: {"tokens": 0, "last": time.time(), "limit": 0})
-
-    def allow(self, key: str, limit: int, period: int) -> RateLimitDecision:
-        now = time.time()
-        b = self._buckets[key]
-        # initialize bucket for key if limit changed or first time
-        if b["limit"] != limit:
-            b["limit"] = limit
-            b["tokens"] = limit
-            b["last"] = now
-
-        elapsed = now - b["last"]
-        refill = int(elapsed / period) * limit
-        if refill > 0:
-            b["tokens"] = min(limit, b["tokens"] + refill)
-            b["last"] = now
-
-        if b["tokens"] > 0:
-            b["tokens"] -= 1
-            return RateLimitDecision(True, b["tokens"])
-        return RateLimitDecision(False, 0)
-
-
-class RedisTokenBucket:
-    """
-    Minimal Redis token bucket using a Lua script for atomicity.
-    Keyed per API key. Stores tokens and last_refill.
-    """
-    LUA = r"""
-local key_tokens = KEYS[1]
-local key_last = KEYS[2]
-local limit = tonumber(ARGV[1])
-local period = tonumber(ARGV[2])
-local now = tonumber(ARGV[3])
-
-local tokens = tonumber(redis.call("GET", key_tokens) or limit)
-local last = tonumber(redis.call("GET", key_last) or now)
-
-local elapsed = now - last
-local refill = math.floor(elapsed / period) * limit
-if refill > 0 then
-  tokens = math.min(limit, tokens + refill)
-  last = now
-end
-
-if tokens > 0 then
-  tokens = tokens - 1
-  redis.call("SET", key_tokens, tokens, "EX", period*2)
-  redis.call("SET", key_last, last, "EX", period*2)
-  return {1, tokens}
-else
-  redis.call("SET", key_tokens, tokens, "EX", period*2)
-  redis.call("SET", key_last, last, "EX", period*2)
-  return {0, 0}
-end
-"""
-
-    def __init__(self, redis_url: str):
-        if redis is None:
-            raise RuntimeError("redis library not installed")
-        self.r = redis.Redis.from_url(redis_url, decode_responses=True)
-        self._sha = self.r.script_load(self.LUA)
-
-    def allow(self, key: str, limit: int, period: int) -> RateLimitDecision:
-        now = int(time.time())
-        kt = f"rl:{key}:tokens"
-        kl = f"rl:{key}:last"
-        allowed, remaining = self.r.evalsha(self._sha, 2, kt, kl, limit, period, now)
-        return RateLimitDecision(bool(int(allowed)), int(remaining))
-
-
-def build_limiter(redis_url: Optional[str]):
-    if redis_url:
-        try:
-            return RedisTokenBucket(redis_url)
-        except Exception:
-            # Fall back to in-memory if Redis unavailable
-            return InMemoryTokenBucket()
-    return InMemoryTokenBucket()
-
+from __future__ import annotations
+import time
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Optional
+
+try:
+    import redis  # type: ignore
+    import redis.asyncio  # type: ignore
+except Exception:  # pragma: no cover
+    redis = None
+
+
+@dataclass
+class RateLimitDecision:
+    allowed: bool
+    remaining: int
+
+
+class InMemoryTokenBucket:
+    """Continuous-rate token bucket.
+
+    Tokens accrue at limit/period per second instead of in whole-limit lumps
+    once per period (the old int(elapsed / period) * limit refill meant no
+    tokens at all until a full period had elapsed, and the refill clock
+    restarted from whenever the lump fired). time.monotonic() is immune to
+    wall-clock skew. Buckets are [tokens, last, limit] lists: index access is
+    cheaper than dict lookups on this per-request path.
+    """
+
+    def __init__(self):
+        self._buckets = defaultdict(lambda: [0.0, time.monotonic(), 0])
+
+    async def allow(self, key: str, limit: int, period: int) -> RateLimitDecision:
+        # async for interface parity with RedisTokenBucket; never actually
+        # awaits, so it costs callers nothing beyond the coroutine call
+        now = time.monotonic()
+        b = self._buckets[key]
+        # initialize bucket for key if limit changed or first time
+        if b[2] != limit:
+            b[0] = float(limit)
+            b[2] = limit
+        else:
+            b[0] = min(limit, b[0] + (now - b[1]) * (limit / period))
+        b[1] = now
+
+        if b[0] >= 1.0:
+            b[0] -= 1.0
+            return RateLimitDecision(True, int(b[0]))
+        return RateLimitDecision(False, 0)
+
+
+class RedisTokenBucket:
+    """
+    Minimal Redis token bucket using a Lua script for atomicity.
+    Keyed per API key. Stores tokens and last_refill.
+    """
+    LUA = r"""
+local key_tokens = KEYS[1]
+local key_last = KEYS[2]
+local limit = tonumber(ARGV[1])
+local period = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+
+local tokens = tonumber(redis.call("GET", key_tokens) or limit)
+local last = tonumber(redis.call("GET", key_last) or now)
+
+-- continuous refill at limit/period tokens per second (see
+-- InMemoryTokenBucket for why lump refill was wrong)
+tokens = math.min(limit, tokens + (now - last) * (limit / period))
+last = now
+
+if tokens >= 1 then
+  tokens = tokens - 1
+  redis.call("SET", key_tokens, tostring(tokens), "EX", period*2)
+  redis.call("SET", key_last, tostring(last), "EX", period*2)
+  return {1, math.floor(tokens)}
+else
+  redis.call("SET", key_tokens, tostring(tokens), "EX", period*2)
+  redis.call("SET", key_last, tostring(last), "EX", period*2)
+  return {0, 0}
+end
+"""
+
+    def __init__(self, redis_url: str):
+        if redis is None:
+            raise RuntimeError("redis library not installed")
+        # Load the script over a short-lived sync client: this doubles as the
+        # reachability probe build_limiter relies on to fall back to the
+        # in-memory bucket when Redis is down (the async client can't be
+        # awaited here).
+        probe = redis.Redis.from_url(redis_url)
+        try:
+            self._sha = probe.script_load(self.LUA)
+        finally:
+            probe.close()
+        # no decode_responses: the only replies we read are the Lua script's
+        # two numbers, and decoding every reply to str just to int() it back
+        # is wasted work on the per-request path. Async client so the event
+        # loop interleaves other requests during the Redis round trip instead
+        # of blocking on it.
+        self.r = redis.asyncio.Redis.from_url(redis_url)
+
+    async def allow(self, key: str, limit: int, period: int) -> RateLimitDecision:
+        # fractional seconds matter now that refill is continuous
+        now = time.time()
+        kt = f"rl:{key}:tokens"
+        kl = f"rl:{key}:last"
+        allowed_raw, remaining_raw = await self.r.evalsha(self._sha, 2, kt, kl, limit, period, now)
+        # Lua numbers come back as ints; tolerate bytes in case a client-side
+        # response transform is ever configured
+        return RateLimitDecision(allowed_raw == 1 or allowed_raw == b"1", int(remaining_raw))
+
+
+def build_limiter(redis_url: Optional[str]):
+    if redis_url:
+        try:
+            return RedisTokenBucket(redis_url)
+        except Exception:
+            # Fall back to in-memory if Redis unavailable
+            return InMemoryTokenBucket()
+    return InMemoryTokenBucket()
+
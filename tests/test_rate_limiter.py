@@ -0,0 +1,48 @@
+import asyncio
+
+import rate_limiter
+from rate_limiter import InMemoryTokenBucket
+
+
+def _allow(bucket, key="k", limit=60, period=60):
+    return asyncio.run(bucket.allow(key, limit=limit, period=period))
+
+
+def test_drained_bucket_denies(monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(rate_limiter.time, "monotonic", lambda: clock[0])
+    bucket = InMemoryTokenBucket()
+    for _ in range(5):
+        assert _allow(bucket, limit=5, period=60).allowed
+    assert not _allow(bucket, limit=5, period=60).allowed
+
+
+def test_tokens_accrue_continuously(monkeypatch):
+    # regression for the lump-refill bug: no tokens at all accrued until a
+    # full period had elapsed
+    clock = [1000.0]
+    monkeypatch.setattr(rate_limiter.time, "monotonic", lambda: clock[0])
+    bucket = InMemoryTokenBucket()
+    for _ in range(60):
+        assert _allow(bucket).allowed
+    assert not _allow(bucket).allowed
+
+    # limit/period = 1 token per second: after 2s exactly two more requests
+    # pass, well before the full 60s period
+    clock[0] += 2.0
+    assert _allow(bucket).allowed
+    assert _allow(bucket).allowed
+    assert not _allow(bucket).allowed
+
+
+def test_tokens_cap_at_limit(monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(rate_limiter.time, "monotonic", lambda: clock[0])
+    bucket = InMemoryTokenBucket()
+    assert _allow(bucket, limit=5, period=60).allowed
+
+    # hours of idle time must not bank more than limit tokens
+    clock[0] += 3600.0
+    for _ in range(5):
+        assert _allow(bucket, limit=5, period=60).allowed
+    assert not _allow(bucket, limit=5, period=60).allowed